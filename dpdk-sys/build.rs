@@ -8,14 +8,16 @@ extern crate regex;
 
 use etrace::some_or;
 use itertools::Itertools;
-use regex::Regex;
+use regex::bytes::Regex;
 use std::cmp::Ordering;
-use std::collections::HashMap;
+use std::collections::hash_map::DefaultHasher;
+use std::collections::{HashMap, HashSet};
 use std::env;
 use std::fs::*;
-use std::io::*;
+use std::hash::{Hash, Hasher};
 use std::path::*;
-use std::process::Command;
+use std::process::{Command, Stdio};
+use std::thread;
 
 /// We make additional wrapper functions for existing bindings.
 /// To avoid collision, we add a magic prefix for each.
@@ -33,6 +35,206 @@ fn strip_comments(comment: String) -> String {
         .join("\n")
 }
 
+/// Fill `%name%` placeholders of a template in a single pass.
+///
+/// Unknown placeholders are left as they are.
+fn fill_template(template: &str, values: &[(&str, &str)]) -> String {
+    let values_len: usize = values.iter().map(|(_, value)| value.len()).sum();
+    let mut result = String::with_capacity(template.len() + values_len);
+    let mut rest = template;
+    while let Some(start) = rest.find('%') {
+        result.push_str(&rest[..start]);
+        rest = &rest[start..];
+        let placeholder = rest[1..].find('%').and_then(|end| {
+            let name = &rest[1..=end];
+            values
+                .iter()
+                .find(|(key, _)| *key == name)
+                .map(|(_, value)| (end + 2, *value))
+        });
+        if let Some((placeholder_len, value)) = placeholder {
+            result.push_str(value);
+            rest = &rest[placeholder_len..];
+        } else {
+            result.push('%');
+            rest = &rest[1..];
+        }
+    }
+    result.push_str(rest);
+    result
+}
+
+/// Check whether a DPDK header can be included directly.
+///
+/// Some headers are only meant to be included through another header, and reject direct
+/// inclusion with an `#error` directive (e.g. `#error "do not include this file directly"`).
+/// Unreadable headers are kept, so that they fail loudly when `dpdk.h` is parsed.
+fn check_direct_include(path: &Path, error_directive: &Regex) -> bool {
+    let data = some_or!(read(path).ok(), return true);
+    !error_directive.is_match(&data)
+}
+
+/// Check whether a directory entry is a regular file.
+///
+/// `read_dir` already reports the file type on most platforms, so only symbolic links need an
+/// additional `stat` call.
+fn is_file_entry(entry: &DirEntry) -> bool {
+    match entry.file_type() {
+        Ok(file_type) if file_type.is_symlink() => entry.path().is_file(),
+        Ok(file_type) => file_type.is_file(),
+        Err(_) => false,
+    }
+}
+
+/// Modification time (in nanoseconds since UNIX epoch) and size of a file.
+type FileStamp = (u128, u64);
+
+/// Get the current `FileStamp` of a file.
+fn file_stamp(path: &Path) -> Option<FileStamp> {
+    let metadata = metadata(path).ok()?;
+    let modified = metadata
+        .modified()
+        .ok()?
+        .duration_since(std::time::UNIX_EPOCH)
+        .ok()?;
+    Some((modified.as_nanos(), metadata.len()))
+}
+
+/// List files which the preprocessor reads for `header_path` (`clang -M`).
+///
+/// With the same arguments, these are exactly the headers bindgen sees.
+fn header_dependencies(header_path: &Path, clang_args: &[String]) -> Option<Vec<PathBuf>> {
+    let output = Command::new("clang")
+        .args(&["-M", "-x", "c"])
+        .arg(header_path)
+        .args(clang_args)
+        .stdin(Stdio::null())
+        .stderr(Stdio::null())
+        .output()
+        .ok()?;
+    if !output.status.success() {
+        return None;
+    }
+    // The output is a make rule: `<target>: <dependency> <dependency> \` (continued lines).
+    // Spaces and `#` in paths are escaped with `\`, and `$` is written as `$$`.
+    let rule = String::from_utf8(output.stdout).ok()?;
+    let mut tokens = vec![];
+    let mut token = String::new();
+    let mut chars = rule.chars().peekable();
+    while let Some(c) = chars.next() {
+        match c {
+            '\\' if chars.peek() == Some(&' ') || chars.peek() == Some(&'#') => {
+                token.push(chars.next().unwrap());
+            }
+            '$' if chars.peek() == Some(&'$') => {
+                token.push(chars.next().unwrap());
+            }
+            '\\' if chars.peek() == Some(&'\n') || chars.peek() == Some(&'\r') => {}
+            c if c.is_whitespace() => {
+                if !token.is_empty() {
+                    tokens.push(std::mem::take(&mut token));
+                }
+            }
+            c => token.push(c),
+        }
+    }
+    if !token.is_empty() {
+        tokens.push(token);
+    }
+    Some(tokens.into_iter().skip(1).map(PathBuf::from).collect())
+}
+
+/// Load header scan results of a previous build.
+///
+/// The first line of the cache file is the pattern used for the scan, and the whole cache is
+/// discarded if it differs from `pattern`. Each following line is
+/// `<includable>\t<mtime>\t<size>\t<path>`.
+fn load_scan_cache(cache_path: &Path, pattern: &str) -> HashMap<PathBuf, (FileStamp, bool)> {
+    let cache_string = read_to_string(cache_path).unwrap_or_default();
+    let mut lines = cache_string.lines();
+    if lines.next() != Some(pattern) {
+        return HashMap::new();
+    }
+    lines
+        .filter_map(|line| {
+            let mut fields = line.splitn(4, '\t');
+            let includable = fields.next()? == "1";
+            let modified = fields.next()?.parse().ok()?;
+            let size = fields.next()?.parse().ok()?;
+            let path = PathBuf::from(fields.next()?);
+            Some((path, ((modified, size), includable)))
+        })
+        .collect()
+}
+
+/// Keep headers which can be included directly.
+///
+/// Scan results are cached in `cache_path` and reused while a header's modification time and size
+/// are unchanged. The remaining headers are split into one chunk per CPU and scanned in parallel.
+/// The order of `headers` is preserved.
+fn filter_direct_includes(headers: Vec<PathBuf>, cache_path: &Path) -> Vec<PathBuf> {
+    // ASCII-only (`-u`) classes and word boundaries let the whole pattern run as a single DFA
+    // pass, even on headers with non-ASCII comments.
+    let pattern = r"(?im-u)^\s*#\s*error\b.*do not.*include.*directly";
+    let cache = load_scan_cache(cache_path, pattern);
+    let stamps: Vec<_> = headers.iter().map(|header| file_stamp(header)).collect();
+    let outdated: Vec<_> = Iterator::zip(headers.iter(), stamps.iter())
+        .filter(|(header, stamp)| match (cache.get(*header), stamp) {
+            (Some((cached_stamp, _)), Some(stamp)) => cached_stamp != stamp,
+            _ => true,
+        })
+        .map(|(header, _)| header.clone())
+        .collect();
+
+    let error_directive = Regex::new(pattern).unwrap();
+    let num_threads = num_cpus::get();
+    let chunk_size = std::cmp::max(1, outdated.len().div_ceil(num_threads));
+    let workers: Vec<_> = outdated
+        .chunks(chunk_size)
+        .map(|chunk| {
+            let chunk = chunk.to_vec();
+            let error_directive = error_directive.clone();
+            thread::spawn(move || {
+                chunk
+                    .into_iter()
+                    .map(|header| {
+                        let includable = check_direct_include(&header, &error_directive);
+                        (header, includable)
+                    })
+                    .collect::<Vec<_>>()
+            })
+        })
+        .collect();
+    let scanned: HashMap<_, _> = workers
+        .into_iter()
+        .flat_map(|worker| worker.join().expect("header scan failed"))
+        .collect();
+
+    // Rebuild the cache from current headers only, dropping entries of removed ones.
+    let mut cache_lines = vec![pattern.to_string()];
+    let mut includable_headers = vec![];
+    for (header, stamp) in Iterator::zip(headers.into_iter(), stamps.into_iter()) {
+        let includable = match scanned.get(&header) {
+            Some(includable) => *includable,
+            None => cache[&header].1,
+        };
+        if let Some((modified, size)) = stamp {
+            cache_lines.push(format!(
+                "{}\t{}\t{}\t{}",
+                includable as u8,
+                modified,
+                size,
+                header.to_str().unwrap()
+            ));
+        }
+        if includable {
+            includable_headers.push(header);
+        }
+    }
+    write(cache_path, cache_lines.join("\n")).ok();
+    includable_headers
+}
+
 /// Information needed to generate DPDK binding.
 ///
 /// Each information is filled at different build stages.
@@ -62,6 +264,9 @@ struct State {
     /// DPDK config file (will be included as a predefined macro file).
     dpdk_config: Option<PathBuf>,
 
+    /// DPDK include and config arguments for libclang, shared by header parsing and bindgen.
+    clang_args: Vec<String>,
+
     /// Use definitions for automatically found EAL APIs.
     eal_function_use_defs: Vec<String>,
 
@@ -93,6 +298,7 @@ impl State {
             dpdk_headers: Default::default(),
             dpdk_links: Default::default(),
             dpdk_config: Default::default(),
+            clang_args: Default::default(),
             eal_function_use_defs: Default::default(),
             static_functions: Default::default(),
             linkable_pmd_functions: Default::default(),
@@ -106,24 +312,10 @@ impl State {
         index: &'a clang::Index,
         header_path: PathBuf,
     ) -> clang::TranslationUnit<'a> {
-        let mut argument = vec![
-            "-march=native".into(),
-            format!(
-                "-I{}",
-                self.include_path.as_ref().unwrap().to_str().unwrap()
-            ),
-            //.to_string(),
-            format!("-I{}", self.out_path.to_str().unwrap()), //.to_string(),
-            "-imacros".into(),
-            self.dpdk_config
-                .as_ref()
-                .unwrap()
-                .to_str()
-                .unwrap()
-                .to_string(),
-        ];
+        let mut argument = vec![String::from("-march=native")];
+        argument.extend(self.clang_args.iter().cloned());
         for path in self.system_include_path.iter() {
-            argument.push(format!("-I{}", path).to_string());
+            argument.push(format!("-I{}", path));
         }
         let trans_unit = index
             .parser(header_path)
@@ -154,16 +346,23 @@ impl State {
 
     /// Check compiler and retrieve link path for C standard libs.
     fn check_compiler(&mut self) {
-        let output = Command::new("bash")
-            .args(&[
-                "-c",
-                "clang -march=native -Wp,-v -x c - -fsyntax-only < /dev/null 2>&1 | sed -e '/^#include <...>/,/^End of search/{ //!b };d'",
-            ])
+        let output = Command::new("clang")
+            .args(&["-march=native", "-Wp,-v", "-x", "c", "-", "-fsyntax-only"])
+            .stdin(Stdio::null())
+            .stdout(Stdio::null())
             .output()
             .expect("failed to extract cc include path");
-        let message = String::from_utf8(output.stdout).unwrap();
-        self.system_include_path
-            .extend(message.lines().map(|x| String::from(x.trim())));
+        // Search paths are listed between `#include <...> search starts here:` and
+        // `End of search list.` in the verbose output.
+        let message = String::from_utf8(output.stderr).unwrap();
+        self.system_include_path.extend(
+            message
+                .lines()
+                .skip_while(|line| !line.starts_with("#include <...>"))
+                .skip(1)
+                .take_while(|line| !line.starts_with("End of search"))
+                .map(|line| String::from(line.trim())),
+        );
     }
 
     /// Find DPDK install path.
@@ -201,93 +400,84 @@ impl State {
             .expect("read_dir failed")
         {
             if let Ok(entry) = entry {
-                let path = entry.path();
-
-                if let Some(ext) = path.extension() {
-                    if ext == "template" {
-                        println!("cargo:rerun-if-changed={}", path.to_str().unwrap());
-                    }
+                let file_name = some_or!(entry.file_name().into_string().ok(), continue);
+                if file_name.ends_with(".template") {
+                    println!("cargo:rerun-if-changed={}", entry.path().to_str().unwrap());
                 }
             }
         }
 
-        println!("cargo:rerun-if-env-changed=RTE_SDK");
-        println!("cargo:rerun-if-env-changed=RTE_TARGET");
-
         self.dpdk_config = Some(config_header);
+
+        self.clang_args = vec![
+            format!(
+                "-I{}",
+                self.include_path.as_ref().unwrap().to_str().unwrap()
+            ),
+            format!("-I{}", self.out_path.to_str().unwrap()),
+            "-imacros".into(),
+            self.dpdk_config
+                .as_ref()
+                .unwrap()
+                .to_str()
+                .unwrap()
+                .to_string(),
+        ];
     }
 
     /// Search through DPDK's link dir and extract library names.
     fn find_link_libs(&mut self) {
         let lib_dir = self.library_path.as_ref().unwrap();
 
-        let mut libs = vec![];
+        // Collect file names only, and sort them as plain strings.
+        let mut lib_names = vec![];
         for entry in lib_dir.read_dir().expect("read_dir failed") {
             if let Ok(entry) = entry {
-                let path = entry.path();
-                if !path.is_file() {
+                let file_name = some_or!(entry.file_name().into_string().ok(), continue);
+                if !file_name.starts_with("librte_") || !file_name.ends_with(".a") {
                     continue;
                 }
-
-                if let Some(ext) = path.extension() {
-                    if ext != "a" {
-                        //if ext != "so" {
-                        continue;
-                    }
-                } else {
-                    continue;
-                }
-
-                if let Some(file_stem) = path.file_stem() {
-                    let string = file_stem.to_str().unwrap();
-                    if !string.starts_with("librte_") {
-                        continue;
-                    }
-                    libs.push(path.clone());
-                } else {
+                if !is_file_entry(&entry) {
                     continue;
                 }
+                lib_names.push(file_name);
             } else {
                 continue;
             }
         }
-        if libs.is_empty() {
+        if lib_names.is_empty() {
             panic!("Cannot find any libraries.");
         }
-        libs.sort();
-        libs.dedup();
-        self.dpdk_links = libs;
+        lib_names.sort_unstable();
+        lib_names.dedup();
+        self.dpdk_links = lib_names.iter().map(|name| lib_dir.join(name)).collect();
     }
     /// Prepare a header file which contains all available DPDK headers.
     fn make_all_in_one_header(&mut self) {
         let include_dir = self.include_path.as_ref().unwrap();
-        let dpdk_config = self.dpdk_config.as_ref().unwrap();
+        let dpdk_config_name = self
+            .dpdk_config
+            .as_ref()
+            .unwrap()
+            .file_name()
+            .unwrap()
+            .to_str()
+            .unwrap();
         // dlb drivers have duplicated enum definitions.
-        let blacklist = vec!["rte_pmd_dlb", "rte_pmd_dlb2"];
+        let blacklist: HashSet<_> = ["rte_pmd_dlb", "rte_pmd_dlb2"].iter().copied().collect();
         let mut headers = vec![];
         for entry in include_dir.read_dir().expect("read_dir failed") {
             if let Ok(entry) = entry {
-                let path = entry.path();
-
-                if !path.is_file() {
-                    continue;
-                }
-                if let Some(stem) = path.file_stem() {
-                    if blacklist.contains(&stem.to_str().unwrap()) {
-                        continue;
-                    }
-                }
-                if let Some(ext) = path.extension() {
-                    if ext != "h" {
-                        continue;
-                    }
-                } else {
+                // Filter by name first, and create a path only for headers we keep.
+                let file_name = some_or!(entry.file_name().into_string().ok(), continue);
+                let stem = some_or!(file_name.strip_suffix(".h"), continue);
+                if blacklist.contains(stem) || file_name == dpdk_config_name {
                     continue;
                 }
-                if path == *dpdk_config {
+                if !is_file_entry(&entry) {
                     continue;
                 }
-                headers.push(path);
+                headers.push(entry.path());
             } else {
                 continue;
             }
@@ -297,27 +487,31 @@ impl State {
         assert!(!headers.is_empty());
 
         // Heuristically remove platform-specific headers
-        let platform_set = vec!["x86", "x86_64", "x64", "arm", "arm32", "arm64", "amd64"];
-        let mut name_set = vec![];
-        for file in &headers {
-            let file_name = String::from(file.file_stem().unwrap().to_str().unwrap());
-            name_set.push(file_name);
-        }
+        let platform_set: HashSet<_> = ["x86", "x86_64", "x64", "arm", "arm32", "arm64", "amd64"]
+            .iter()
+            .copied()
+            .collect();
+        let name_set: HashSet<_> = headers
+            .iter()
+            .map(|file| file.file_stem().unwrap().to_str().unwrap())
+            .collect();
         let mut new_vec = vec![];
-        'outer: for file in &headers {
+        for file in &headers {
             let file_name = file.file_stem().unwrap().to_str().unwrap();
-            for prev_name in &name_set {
-                if file_name.starts_with(&format!("{}_", prev_name)) {
-                    continue 'outer;
-                }
-            }
-            for platform in &platform_set {
-                if file_name.ends_with(&format!("_{}", platform)) {
-                    continue 'outer;
-                }
+            // Skip `<name>_*` if `<name>` is also a header, and `*_<platform>`. Both are looked up
+            // at every `_` instead of comparing against every other header.
+            let is_specific = file_name.match_indices('_').any(|(index, _)| {
+                name_set.contains(&file_name[..index])
+                    || platform_set.contains(&file_name[index + 1..])
+            });
+            if !is_specific {
+                new_vec.push(file.clone());
             }
-            new_vec.push(file.clone());
         }
+
+        // Read and scan only the headers which survived the name-based filters above.
+        let scan_cache_path = self.out_path.join("header_scan.cache");
+        let mut new_vec = filter_direct_includes(new_vec, &scan_cache_path);
         new_vec.sort_by(|left, right| {
             let left_str = left.file_stem().unwrap().to_str().unwrap();
             let right_str = right.file_stem().unwrap().to_str().unwrap();
@@ -336,19 +530,19 @@ impl State {
         self.dpdk_headers = headers;
         let template_path = self.project_path.join("gen/dpdk.h.template");
         let target_path = self.out_path.join("dpdk.h");
-        let mut template = File::open(template_path).unwrap();
-        let mut target = File::create(target_path).unwrap();
-        let mut template_string = String::new();
-        template.read_to_string(&mut template_string).ok();
-        let mut headers_string = String::new();
-        for header in &self.dpdk_headers {
-            headers_string += &format!(
-                "#include \"{}\"\n",
-                header.file_name().unwrap().to_str().unwrap()
-            );
-        }
-        let formatted_string = template_string.replace("%header_list%", &headers_string);
-        target.write_fmt(format_args!("{}", formatted_string)).ok();
+        let template_string = read_to_string(template_path).unwrap();
+        let headers_string = self
+            .dpdk_headers
+            .iter()
+            .map(|header| {
+                format!(
+                    "#include \"{}\"\n",
+                    header.file_name().unwrap().to_str().unwrap()
+                )
+            })
+            .join("");
+        let formatted_string = fill_template(&template_string, &[("header_list", &headers_string)]);
+        write(target_path, formatted_string).expect("failed to write dpdk.h");
     }
 
     /// Extract trivial EAL APIs whose paramter types are all primitive (e.g. `uint8_t`).
@@ -696,47 +890,71 @@ impl State {
             .join("\n");
 
         // Generate header file from template
-        let mut template = File::open(header_template).unwrap();
-        let mut template_string = String::new();
-        template.read_to_string(&mut template_string).ok();
-        let formatted_string = template_string.replace("%header_defs%", &header_defs);
-        let mut target = File::create(header_path).unwrap();
-        target.write_fmt(format_args!("{}", &formatted_string)).ok();
+        let template_string = read_to_string(header_template).unwrap();
+        let formatted_string = fill_template(&template_string, &[("header_defs", &header_defs)]);
+        write(header_path, formatted_string).expect("failed to write static.h");
 
         // Generate source file from template
-        let mut template = File::open(source_template).unwrap();
-        let mut template_string = String::new();
-        template.read_to_string(&mut template_string).ok();
-        let formatted_string = template_string.replace("%static_impls%", &static_impls);
-        let formatted_string =
-            formatted_string.replace("%linkable_extern_defs%", &linkable_extern_defs);
-        let formatted_string = formatted_string.replace("%explicit_pmd_links%", &perlist_links);
-        let mut target = File::create(source_path).unwrap();
-        target.write_fmt(format_args!("{}", &formatted_string)).ok();
+        let template_string = read_to_string(source_template).unwrap();
+        let formatted_string = fill_template(
+            &template_string,
+            &[
+                ("static_impls", &static_impls),
+                ("linkable_extern_defs", &linkable_extern_defs),
+                ("explicit_pmd_links", &perlist_links),
+            ],
+        );
+        write(source_path, formatted_string).expect("failed to write static.c");
     }
 
     /// Generate Rust bindings from DPDK source.
+    ///
+    /// Running bindgen dominates build time, so it is skipped if its inputs (bindgen options and
+    /// all headers it reads) are unchanged since the last run.
     fn generate_rust_def(&mut self) {
-        let dpdk_include_path = self.include_path.as_ref().unwrap();
-        let dpdk_config_path = self.dpdk_config.as_ref().unwrap();
-
         let header_path = self.out_path.join("static.h");
         let target_path = self.out_path.join("dpdk.rs");
-        bindgen::builder()
+        let hash_path = self.out_path.join("dpdk.rs.hash");
+        let mut clang_args = self.clang_args.clone();
+        clang_args.push("-march=native".into());
+        clang_args.push("-Wno-everything".into());
+        let builder = bindgen::builder()
             .header(header_path.to_str().unwrap())
-            .clang_arg(format!("-I{}", dpdk_include_path.to_str().unwrap()))
-            .clang_arg(format!("-I{}", self.out_path.to_str().unwrap()))
-            .clang_arg("-imacros")
-            .clang_arg(dpdk_config_path.to_str().unwrap())
-            .clang_arg("-march=native")
-            .clang_arg("-Wno-everything")
+            .clang_args(&clang_args)
             .rustfmt_bindings(true)
             .opaque_type("max_align_t")
-            .opaque_type("rte_event.*")
-            .generate()
-            .unwrap()
-            .write_to_file(target_path)
-            .ok();
+            .opaque_type("rte_event.*");
+
+        // Generated headers are rewritten on every build, so hash their contents instead of
+        // their `FileStamp`s. Any dependency which cannot be read is treated as a cache miss.
+        let input_hash = header_dependencies(&header_path, &clang_args).and_then(|dependencies| {
+            let mut hasher = DefaultHasher::new();
+            builder.command_line_flags().hash(&mut hasher);
+            read(&header_path).ok()?.hash(&mut hasher);
+            read(self.out_path.join("dpdk.h")).ok()?.hash(&mut hasher);
+            for dependency in dependencies {
+                if dependency.starts_with(&self.out_path) {
+                    read(&dependency).ok()?.hash(&mut hasher);
+                } else {
+                    file_stamp(&dependency)?.hash(&mut hasher);
+                }
+                dependency.hash(&mut hasher);
+            }
+            Some(format!("{:016x}", hasher.finish()))
+        });
+        if let Some(input_hash) = &input_hash {
+            if target_path.exists() && read_to_string(&hash_path).ok().as_ref() == Some(input_hash)
+            {
+                return;
+            }
+        }
+
+        // Never leave a hash next to a `dpdk.rs` which it does not describe.
+        remove_file(&hash_path).ok();
+        let result = builder.generate().unwrap().write_to_file(&target_path);
+        if let (Ok(()), Some(input_hash)) = (result, input_hash) {
+            write(hash_path, input_hash).ok();
+        }
     }
 
     /// Generate Rust source files.
@@ -773,26 +991,24 @@ impl State {
             .map(|name| format!("\t\t{prefix}{name}();", prefix = PREFIX, name = name))
             .join("\n");
 
-        let mut template = File::open(template_path).unwrap();
-        let mut template_string = String::new();
-        template.read_to_string(&mut template_string).ok();
-
-        let formatted_string = template_string.replace("%static_use_defs%", &static_use_string);
-        let formatted_string =
-            formatted_string.replace("%explicit_use_defs%", &explicit_use_string);
-        let formatted_string =
-            formatted_string.replace("%explicit_invokes%", &explicit_invoke_string);
-        let formatted_string = formatted_string.replace(
-            "%static_eal_functions%",
-            &self
-                .eal_function_use_defs
-                .iter()
-                .map(|item| item.replace("\n", "\n\t"))
-                .join("\n"),
+        let template_string = read_to_string(template_path).unwrap();
+
+        let static_eal_string = self
+            .eal_function_use_defs
+            .iter()
+            .map(|item| item.replace("\n", "\n\t"))
+            .join("\n");
+        let formatted_string = fill_template(
+            &template_string,
+            &[
+                ("static_use_defs", &static_use_string),
+                ("explicit_use_defs", &explicit_use_string),
+                ("explicit_invokes", &explicit_invoke_string),
+                ("static_eal_functions", &static_eal_string),
+            ],
         );
 
-        let mut target = File::create(target_path).unwrap();
-        target.write_fmt(format_args!("{}", formatted_string)).ok();
+        write(target_path, formatted_string).expect("failed to write lib.rs");
     }
 
     /// Do compile.
@@ -823,12 +1039,14 @@ impl State {
         );
 
         // Legacy mode: Rust cargo cannot recognize library groups (libdpdk.a).
-        let format = Regex::new(r"lib(.*)\.(a)").unwrap();
         for link in &self.dpdk_links {
             let lib_name = link.file_name().unwrap().to_str().unwrap();
 
-            if let Some(capture) = format.captures(lib_name) {
-                let link_name = &capture[1];
+            // `lib<name>.a` -> `<name>`
+            let link_name = lib_name
+                .strip_prefix("lib")
+                .and_then(|name| name.strip_suffix(".a"));
+            if let Some(link_name) = link_name {
                 if link_name == "dpdk" {
                     continue;
                 } else if link_name == "rte_pmd_mlx5" {